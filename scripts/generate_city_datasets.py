@@ -5,11 +5,33 @@ Creates hot_cities.json and all_cities.json for autocomplete
 """
 
 import csv
+import functools
 import json
+import operator
+import re
 import sys
 import unicodedata
 
-def normalize_city_name(name):
+# Special character transliteration table (applied before NFD decomposition)
+_TRANSLITERATION_TABLE = str.maketrans({
+    'Đ': 'D', 'đ': 'd',  # Vietnamese D with stroke
+    'Ð': 'D', 'ð': 'd',  # Icelandic eth
+    'Ø': 'O', 'ø': 'o',  # Nordic O with stroke
+    'Æ': 'AE', 'æ': 'ae',  # Nordic/Latin AE ligature
+    'Œ': 'OE', 'œ': 'oe',  # Latin OE ligature
+    'ẞ': 'SS', 'ß': 'ss',  # German sharp S
+    'Þ': 'TH', 'þ': 'th',  # Icelandic thorn
+    'Ł': 'L', 'ł': 'l',  # Polish L with stroke
+})
+
+# Anything outside the normalized alphabet, matched after lowercasing
+_DISALLOWED_CHARS = re.compile(r'[^a-z0-9 _-]')
+
+# The underscore parameters bind globals as fast locals; callers never pass them
+@functools.lru_cache(maxsize=65536)
+def normalize_city_name(name, _table=_TRANSLITERATION_TABLE,
+                        _normalize=unicodedata.normalize,
+                        _strip_disallowed=_DISALLOWED_CHARS.sub):
     """
     Normalize city name for alphabetical sorting with proper Latin transliteration.
 
@@ -24,51 +46,44 @@ def normalize_city_name(name):
     if not name:
         return ""
 
-    # Special character transliteration map (before NFD decomposition)
-    transliteration_map = {
-        'Đ': 'D', 'đ': 'd',  # Vietnamese D with stroke
-        'Ð': 'D', 'ð': 'd',  # Icelandic eth
-        'Ø': 'O', 'ø': 'o',  # Nordic O with stroke
-        'Æ': 'AE', 'æ': 'ae',  # Nordic/Latin AE ligature
-        'Œ': 'OE', 'œ': 'oe',  # Latin OE ligature
-        'ẞ': 'SS', 'ß': 'ss',  # German sharp S
-        'Þ': 'TH', 'þ': 'th',  # Icelandic thorn
-        'Ł': 'L', 'ł': 'l',  # Polish L with stroke
-    }
-
     # Step 1: Apply special transliterations
-    result = []
-    for char in name:
-        if char in transliteration_map:
-            result.append(transliteration_map[char])
-        else:
-            result.append(char)
-    transliterated = ''.join(result)
-
-    # Step 2: NFD decomposition (é → e + accent, ñ → n + tilde)
-    nfd = unicodedata.normalize('NFD', transliterated)
-
-    # Step 3: Remove combining marks and keep only valid characters
-    normalized = []
-    for char in nfd:
-        # Skip combining marks (accents, diacritics)
-        if unicodedata.category(char) == 'Mn':
-            continue
-
-        # Convert to lowercase
-        char_lower = char.lower()
-        c = ord(char_lower)
-
-        # Keep only: a-z, 0-9, space, hyphen, underscore
-        if ord('a') <= c <= ord('z'):
-            normalized.append(char_lower)
-        elif ord('0') <= c <= ord('9'):
-            normalized.append(char_lower)
-        elif char_lower in (' ', '-', '_'):
-            normalized.append(char_lower)
-        # Skip all other characters
-
-    return ''.join(normalized)
+    transliterated = name.translate(_table)
+
+    # Fast path: pure ASCII has nothing to decompose, only filter
+    if transliterated.isascii():
+        return _strip_disallowed('', transliterated.lower())
+
+    # Step 2: NFD decomposition (é → e + accent, ñ → n + tilde), then drop
+    # combining marks and any other non-ASCII in a single encode call
+    ascii_only = _normalize('NFD', transliterated).encode('ascii', 'ignore').decode('ascii')
+
+    # Step 3: Keep only a-z, 0-9, space, hyphen, underscore
+    return _strip_disallowed('', ascii_only.lower())
+
+def normalize_batch(names):
+    """
+    Normalize many names at once; map() keeps the per-name loop in C.
+    """
+    return list(map(normalize_city_name, names))
+
+def encode_cities(cities):
+    """
+    Encode each city to a JSON line once, so overlapping outputs can share it.
+
+    Each city is encoded on its own with json.dumps (no indent, so the C encoder
+    is used) instead of pretty-printing the whole document in pure Python.
+    Output is compact: the C-side consumer gains nothing from whitespace.
+    """
+    return [json.dumps(city, separators=(',', ':'), ensure_ascii=False) for city in cities]
+
+def write_cities_json(path, city_lines):
+    """
+    Write {"cities": [...]} to path, one pre-encoded city object per line.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"cities":[\n')
+        f.write(',\n'.join(city_lines))
+        f.write('\n]}\n')
 
 def main():
     input_csv = "just-weather/cache/worldcities.csv"
@@ -84,26 +99,44 @@ def main():
     cities = []
 
     with open(input_csv, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+
+        # Resolve column positions once instead of building a dict per row
+        # (an empty file has no header row and simply yields no cities)
+        columns = ('city', 'country', 'iso2', 'lat', 'lng', 'population')
+        header = next(reader, None) or columns
+        i_city, i_country, i_iso2, i_lat, i_lng, i_pop = (
+            header.index(column) for column in columns
+        )
+        i_last = max(i_city, i_country, i_iso2, i_lat, i_lng, i_pop)
 
         for row in reader:
-            # Parse population (may be empty)
+            # Skip blank or truncated rows
+            if len(row) <= i_last:
+                continue
+
+            # Parse population (may be empty; usually a plain integer string,
+            # occasionally written as a float like "1.5e3")
             try:
-                population = int(float(row['population'])) if row['population'] else 0
-            except (ValueError, KeyError):
+                pop = row[i_pop]
+                if pop.isdigit():
+                    population = int(pop)
+                else:
+                    population = int(float(pop)) if pop else 0
+            except ValueError:
                 population = 0
 
             # Parse coordinates
             try:
-                lat = float(row['lat'])
-                lng = float(row['lng'])
-            except (ValueError, KeyError):
+                lat = float(row[i_lat])
+                lng = float(row[i_lng])
+            except ValueError:
                 continue  # Skip cities without valid coordinates
 
             city = {
-                "name": row['city'],
-                "country": row['country'],
-                "country_code": row['iso2'],
+                "name": row[i_city],
+                "country": row[i_country],
+                "country_code": row[i_iso2],
                 "lat": lat,
                 "lon": lng,
                 "population": population
@@ -114,33 +147,34 @@ def main():
     print(f"Loaded {len(cities)} cities from CSV")
 
     # Sort all cities alphabetically by normalized name
-    cities.sort(key=lambda x: normalize_city_name(x['name']))
+    # (decorate-sort-undecorate: normalize each name exactly once)
+    keys = normalize_batch([city['name'] for city in cities])
+    keyed = list(zip(keys, cities))
+    keyed.sort(key=operator.itemgetter(0))
 
     # Select top-N cities (already sorted alphabetically)
-    hot_cities = cities[:HOT_CITIES_COUNT]
-    all_cities = cities[:ALL_CITIES_COUNT]
+    all_cities = [city for _, city in keyed[:ALL_CITIES_COUNT]]
 
-    # Create hot_cities JSON
-    hot_cities_data = {"cities": hot_cities}
+    # hot_cities is a prefix of all_cities
+    hot_cities = all_cities[:HOT_CITIES_COUNT]
 
-    with open(hot_cities_output, 'w', encoding='utf-8') as f:
-        json.dump(hot_cities_data, f, indent=2, ensure_ascii=False)
+    # Serialize every city once; hot_cities reuses the prefix
+    city_lines = encode_cities(all_cities)
+
+    # Create hot_cities JSON
+    write_cities_json(hot_cities_output, city_lines[:HOT_CITIES_COUNT])
 
     print(f"Created {hot_cities_output} with {len(hot_cities)} cities (sorted alphabetically)")
 
     # Create all_cities JSON
-    all_cities_data = {"cities": all_cities}
-
-    with open(all_cities_output, 'w', encoding='utf-8') as f:
-        json.dump(all_cities_data, f, indent=2, ensure_ascii=False)
+    write_cities_json(all_cities_output, city_lines)
 
     print(f"Created {all_cities_output} with {len(all_cities)} cities (sorted alphabetically)")
 
     # Show first 10 cities alphabetically
     print("\nFirst 10 cities alphabetically:")
-    for i, city in enumerate(hot_cities[:10], 1):
+    for i, (normalized, city) in enumerate(keyed[:10], 1):
         pop_m = city['population'] / 1_000_000
-        normalized = normalize_city_name(city['name'])
         print(f"{i:2d}. {city['name']:<20} -> '{normalized}' ({city['country']:<20} {pop_m:>6.1f}M)")
 
 if __name__ == "__main__":
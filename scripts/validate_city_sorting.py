@@ -4,61 +4,86 @@ Validate that city datasets are properly sorted for binary search.
 Uses the EXACT same normalization logic as C code.
 """
 
+import functools
+import itertools
 import json
+import operator
+import re
 import sys
 import unicodedata
 
-def normalize_city_name(name):
+# Special character transliteration table (applied before NFD decomposition)
+_TRANSLITERATION_TABLE = str.maketrans({
+    'Đ': 'D', 'đ': 'd',  # Vietnamese D with stroke
+    'Ð': 'D', 'ð': 'd',  # Icelandic eth
+    'Ø': 'O', 'ø': 'o',  # Nordic O with stroke
+    'Æ': 'AE', 'æ': 'ae',  # Nordic/Latin AE ligature
+    'Œ': 'OE', 'œ': 'oe',  # Latin OE ligature
+    'ẞ': 'SS', 'ß': 'ss',  # German sharp S
+    'Þ': 'TH', 'þ': 'th',  # Icelandic thorn
+    'Ł': 'L', 'ł': 'l',  # Polish L with stroke
+})
+
+# Anything outside the normalized alphabet, matched after lowercasing
+_DISALLOWED_CHARS = re.compile(r'[^a-z0-9 _-]')
+
+# The underscore parameters bind globals as fast locals; callers never pass them
+@functools.lru_cache(maxsize=65536)
+def normalize_city_name(name, _table=_TRANSLITERATION_TABLE,
+                        _normalize=unicodedata.normalize,
+                        _strip_disallowed=_DISALLOWED_CHARS.sub):
     """
     EXACT copy of normalization from generate_city_datasets.py
     """
     if not name:
         return ""
 
-    # Special character transliteration map (before NFD decomposition)
-    transliteration_map = {
-        'Đ': 'D', 'đ': 'd',  # Vietnamese D with stroke
-        'Ð': 'D', 'ð': 'd',  # Icelandic eth
-        'Ø': 'O', 'ø': 'o',  # Nordic O with stroke
-        'Æ': 'AE', 'æ': 'ae',  # Nordic/Latin AE ligature
-        'Œ': 'OE', 'œ': 'oe',  # Latin OE ligature
-        'ẞ': 'SS', 'ß': 'ss',  # German sharp S
-        'Þ': 'TH', 'þ': 'th',  # Icelandic thorn
-        'Ł': 'L', 'ł': 'l',  # Polish L with stroke
-    }
-
     # Step 1: Apply special transliterations
-    result = []
-    for char in name:
-        if char in transliteration_map:
-            result.append(transliteration_map[char])
-        else:
-            result.append(char)
-    transliterated = ''.join(result)
-
-    # Step 2: NFD decomposition (é → e + accent, ñ → n + tilde)
-    nfd = unicodedata.normalize('NFD', transliterated)
-
-    # Step 3: Remove combining marks and keep only valid characters
-    normalized = []
-    for char in nfd:
-        # Skip combining marks (accents, diacritics)
-        if unicodedata.category(char) == 'Mn':
+    transliterated = name.translate(_table)
+
+    # Fast path: pure ASCII has nothing to decompose, only filter
+    if transliterated.isascii():
+        return _strip_disallowed('', transliterated.lower())
+
+    # Step 2: NFD decomposition (é → e + accent, ñ → n + tilde), then drop
+    # combining marks and any other non-ASCII in a single encode call
+    ascii_only = _normalize('NFD', transliterated).encode('ascii', 'ignore').decode('ascii')
+
+    # Step 3: Keep only a-z, 0-9, space, hyphen, underscore
+    return _strip_disallowed('', ascii_only.lower())
+
+def normalize_batch(names):
+    """
+    Normalize many names at once; map() keeps the per-name loop in C.
+    """
+    return list(map(normalize_city_name, names))
+
+def find_sorting_errors(cities, keys):
+    """
+    Walk cities one by one and describe every missing name / sorting violation.
+    """
+    errors = []
+    prev_normalized = None
+    prev_city = None
+
+    for i, (city, normalized) in enumerate(zip(cities, keys)):
+        if 'name' not in city:
+            errors.append(f"  City at index {i} missing 'name' field")
             continue
 
-        # Convert to lowercase
-        char_lower = char.lower()
-        c = ord(char_lower)
+        if prev_normalized is not None:
+            if normalized < prev_normalized:
+                errors.append(
+                    f"  Sorting violation at index {i}:\n"
+                    f"    Previous: '{prev_city['name']}' -> '{prev_normalized}'\n"
+                    f"    Current:  '{city['name']}' -> '{normalized}'\n"
+                    f"    ('{normalized}' should come AFTER '{prev_normalized}')"
+                )
 
-        # Keep only: a-z, 0-9, space, hyphen, underscore
-        if ord('a') <= c <= ord('z'):
-            normalized.append(char_lower)
-        elif ord('0') <= c <= ord('9'):
-            normalized.append(char_lower)
-        elif char_lower in (' ', '-', '_'):
-            normalized.append(char_lower)
+        prev_normalized = normalized
+        prev_city = city
 
-    return ''.join(normalized)
+    return errors
 
 def validate_sorting(filepath):
     """
@@ -85,29 +110,17 @@ def validate_sorting(filepath):
 
     print(f"  Total cities: {len(cities)}")
 
-    # Check sorting
-    errors = []
-    prev_normalized = None
-    prev_city = None
-
-    for i, city in enumerate(cities):
-        if 'name' not in city:
-            errors.append(f"  City at index {i} missing 'name' field")
-            continue
+    # Normalize all names up front (cities without a name get an unused key)
+    keys = normalize_batch(city['name'] if 'name' in city else None for city in cities)
 
-        normalized = normalize_city_name(city['name'])
+    # Check sorting: one short-circuiting pass over adjacent key pairs, and
+    # only build detailed error messages when something is actually wrong
+    has_all_names = all('name' in city for city in cities)
+    out_of_order = any(map(operator.gt, keys, itertools.islice(keys, 1, None)))
 
-        if prev_normalized is not None:
-            if normalized < prev_normalized:
-                errors.append(
-                    f"  Sorting violation at index {i}:\n"
-                    f"    Previous: '{prev_city['name']}' -> '{prev_normalized}'\n"
-                    f"    Current:  '{city['name']}' -> '{normalized}'\n"
-                    f"    ('{normalized}' should come AFTER '{prev_normalized}')"
-                )
-
-        prev_normalized = normalized
-        prev_city = city
+    errors = []
+    if out_of_order or not has_all_names:
+        errors = find_sorting_errors(cities, keys)
 
     if errors:
         return False, "\n".join(errors), None